@@ -9,6 +9,21 @@ import os
 import sys
 import shutil
 
+EXCLUDED_MODULES = [
+    'tkinter',
+    'test',
+    'unittest',
+    'pydoc_data',
+    'lib2to3',
+    'distutils',
+    'pip',
+    'setuptools',
+    'IPython',
+    'numpy',
+    'pandas',
+]
+
+
 def build():
     """Build the executable."""
     script_dir = os.path.dirname(os.path.abspath(__file__))
@@ -26,9 +41,10 @@ def build():
     print(f'Script: {server_script}')
     print(f'Output: {dist_path}')
 
-    PyInstaller.__main__.run([
+    args = [
         server_script,
-        '--onefile',
+        # One-folder bundle: no self-extraction to a temp dir on every launch
+        '--onedir',
         '--name=yt-helper-backend',
         f'--distpath={dist_path}',
         f'--workpath={build_path}',
@@ -38,25 +54,53 @@ def build():
         '--hidden-import=flask',
         '--hidden-import=flask_cors',
         '--hidden-import=werkzeug',
+        '--hidden-import=waitress',
+        '--hidden-import=orjson',
         # DNS and network imports for yt-dlp
         '--hidden-import=dns.rdtypes.*',
         '--hidden-import=dns.dnssecalgs.*',
         # Collect all yt-dlp resources
         '--collect-all=yt_dlp',
+        # Compile bundled bytecode as with python -O (asserts stripped).
+        # Level 2 would also drop docstrings, which some libraries read.
+        '--optimize=1',
         '--noconfirm',
         '--clean',
         # Console mode for debugging (can see errors)
         '--console',
-    ])
+    ]
+
+    # Leave out stdlib/tooling modules the backend never imports to shrink
+    # the bundle that has to be unpacked on startup
+    for module in EXCLUDED_MODULES:
+        args.append(f'--exclude-module={module}')
+
+    # Stripping symbols is only supported for non-Windows binaries
+    if sys.platform != 'win32':
+        args.append('--strip')
+
+    # Compress with UPX when it's available
+    upx_dir = os.environ.get('UPX_DIR')
+    if upx_dir:
+        args.append(f'--upx-dir={upx_dir}')
+    else:
+        args.append('--noupx')
+
+    PyInstaller.__main__.run(args)
 
     # Verify build
-    exe_path = os.path.join(dist_path, 'yt-helper-backend.exe' if sys.platform == 'win32' else 'yt-helper-backend')
+    bundle_path = os.path.join(dist_path, 'yt-helper-backend')
+    exe_path = os.path.join(bundle_path, 'yt-helper-backend.exe' if sys.platform == 'win32' else 'yt-helper-backend')
 
     if os.path.exists(exe_path):
-        size_mb = os.path.getsize(exe_path) / (1024 * 1024)
+        size_mb = sum(
+            os.path.getsize(os.path.join(root, name))
+            for root, _, files in os.walk(bundle_path)
+            for name in files
+        ) / (1024 * 1024)
         print(f'\nBuild complete!')
         print(f'Executable: {exe_path}')
-        print(f'Size: {size_mb:.1f} MB')
+        print(f'Bundle size: {size_mb:.1f} MB')
     else:
         print('\nBuild failed - executable not found!')
         sys.exit(1)
@@ -3,73 +3,117 @@
 YouTube Downloader module using yt-dlp.
 """
 
+import os
 import re
+import subprocess
+import threading
+import time
 import yt_dlp
+from collections import deque
+from functools import lru_cache
 from typing import Callable, Optional, Dict, Any
 
+# Persistent yt-dlp cache (player JS signature/nsig functions) so cold
+# extractions don't re-fetch and re-parse base.js on every launch
+CACHE_DIR = os.path.join(os.path.expanduser('~'), '.yt-helper-cache')
+
+# Minimum interval (seconds) and progress delta (percent) between
+# 'downloading' updates passed to progress_callback
+PROGRESS_INTERVAL = 0.2
+PROGRESS_MIN_DELTA = 1.0
+
+# Parallel fragment fetches for HLS/DASH, and Range-request chunk size for
+# progressive formats
+CONCURRENT_FRAGMENTS = 8
+HTTP_CHUNK_SIZE = 10 * 1024 * 1024
+# Initial read block size for the HTTP downloader (yt-dlp defaults to 1 KiB);
+# it still adapts the block to the link speed from there
+BUFFER_SIZE = 1024 * 1024
+# Drop stalled connections instead of hanging a worker indefinitely
+SOCKET_TIMEOUT = 30
+
+# [[HH:]MM:]SS[.fff]
+_TIME_RE = re.compile(r'^(?:(?:(\d+):)?(\d+):)?(\d+(?:\.\d+)?)$')
+
+
+@lru_cache(maxsize=128)
+def _parse_time(time_str: str) -> float:
+    """Parse a [[HH:]MM:]SS time string to seconds (0 if malformed)."""
+    m = _TIME_RE.match(time_str.strip())
+    if not m:
+        return 0.0
+    h, mn, s = m.groups()
+    return int(h or 0) * 3600 + int(mn or 0) * 60 + float(s)
+
 
 class YouTubeDownloader:
     """YouTube video/audio downloader using yt-dlp."""
 
+    _URL_RE = re.compile(
+        r'^(?:https?://)?(?:www\.)?'
+        r'(?:youtube\.com/(?:watch\?v=|shorts/)|youtu\.be/)[\w-]+'
+    )
+
+    QUALITY_MAP = {
+        'best': 'bestvideo+bestaudio/best',
+        '2160p': 'bestvideo[height<=2160]+bestaudio/best[height<=2160]',
+        '1440p': 'bestvideo[height<=1440]+bestaudio/best[height<=1440]',
+        '1080p': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
+        '720p': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
+        '480p': 'bestvideo[height<=480]+bestaudio/best[height<=480]',
+        '360p': 'bestvideo[height<=360]+bestaudio/best[height<=360]',
+    }
+    # Highest first, as (label, height) pairs for matching format heights
+    _QUALITY_ORDER = tuple((q, int(q[:-1])) for q in QUALITY_MAP if q != 'best')
+    VIDEO_FORMATS = ('mp4', 'webm', 'mkv')
+    AUDIO_FORMATS = ('mp3', 'm4a', 'ogg', 'wav', 'flac')
+
     def __init__(self):
-        self.quality_map = {
-            'best': 'bestvideo+bestaudio/best',
-            '2160p': 'bestvideo[height<=2160]+bestaudio/best[height<=2160]',
-            '1440p': 'bestvideo[height<=1440]+bestaudio/best[height<=1440]',
-            '1080p': 'bestvideo[height<=1080]+bestaudio/best[height<=1080]',
-            '720p': 'bestvideo[height<=720]+bestaudio/best[height<=720]',
-            '480p': 'bestvideo[height<=480]+bestaudio/best[height<=480]',
-            '360p': 'bestvideo[height<=360]+bestaudio/best[height<=360]',
-        }
+        os.makedirs(CACHE_DIR, exist_ok=True)
+
+        # Shared extractor for metadata lookups; building a YoutubeDL
+        # instance registers every extractor, so reuse one across requests.
+        self._info_ydl = yt_dlp.YoutubeDL({
+            'quiet': True,
+            'no_warnings': True,
+            'skip_download': True,
+            'cachedir': CACHE_DIR,
+            'socket_timeout': SOCKET_TIMEOUT,
+            'extract_flat': 'in_playlist',
+        })
+        self._info_lock = threading.Lock()
 
     def validate_url(self, url: str) -> bool:
         """Validate if URL is a valid YouTube URL."""
-        patterns = [
-            r'^(https?://)?(www\.)?youtube\.com/watch\?v=[\w-]+',
-            r'^(https?://)?(www\.)?youtu\.be/[\w-]+',
-            r'^(https?://)?(www\.)?youtube\.com/shorts/[\w-]+',
-        ]
-        return any(re.match(pattern, url) for pattern in patterns)
+        return self._URL_RE.match(url) is not None
 
     def get_video_info(self, url: str) -> Dict[str, Any]:
         """Fetch video metadata without downloading."""
         if not self.validate_url(url):
             raise ValueError('Invalid YouTube URL')
 
-        ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'extract_flat': False,
+        # YoutubeDL is not thread-safe and Flask serves requests concurrently
+        with self._info_lock:
+            info = self._info_ydl.extract_info(url, download=False)
+
+        # Get available qualities, sorted highest first
+        heights = {fmt['height'] for fmt in info.get('formats', ()) if fmt.get('height')}
+        sorted_qualities = ['best', *(q for q, h in self._QUALITY_ORDER if h in heights)]
+
+        return {
+            'id': info.get('id', ''),
+            'title': info.get('title', 'Unknown'),
+            'description': info.get('description', ''),
+            'thumbnail': info.get('thumbnail', ''),
+            'duration': info.get('duration', 0),
+            'channel': info.get('uploader', 'Unknown'),
+            'uploadDate': info.get('upload_date', ''),
+            'viewCount': info.get('view_count', 0),
+            'availableQualities': sorted_qualities,
+            'availableVideoFormats': list(self.VIDEO_FORMATS),
+            'availableAudioFormats': list(self.AUDIO_FORMATS),
         }
 
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            info = ydl.extract_info(url, download=False)
-
-            # Get available qualities
-            available_qualities = set()
-            for fmt in info.get('formats', []):
-                height = fmt.get('height')
-                if height:
-                    available_qualities.add(f'{height}p')
-
-            # Sort qualities
-            quality_order = ['2160p', '1440p', '1080p', '720p', '480p', '360p']
-            sorted_qualities = ['best'] + [q for q in quality_order if q in available_qualities]
-
-            return {
-                'id': info.get('id', ''),
-                'title': info.get('title', 'Unknown'),
-                'description': info.get('description', ''),
-                'thumbnail': info.get('thumbnail', ''),
-                'duration': info.get('duration', 0),
-                'channel': info.get('uploader', 'Unknown'),
-                'uploadDate': info.get('upload_date', ''),
-                'viewCount': info.get('view_count', 0),
-                'availableQualities': sorted_qualities,
-                'availableVideoFormats': ['mp4', 'webm', 'mkv'],
-                'availableAudioFormats': ['mp3', 'm4a', 'ogg', 'wav', 'flac'],
-            }
-
     def download(
         self,
         url: str,
@@ -105,23 +149,33 @@ class YouTubeDownloader:
             raise ValueError('Invalid YouTube URL')
 
         result = {'filename': None}
+        last_emit = [0.0]
+        last_progress = [-1.0]
 
         def progress_hook(d):
             if cancel_check and cancel_check():
                 raise Exception('Download cancelled')
 
             if progress_callback and d['status'] == 'downloading':
-                # Parse progress info
+                # Parse progress info, preferring the raw byte counters
                 progress = 0
-                if '_percent_str' in d:
+                downloaded = d.get('downloaded_bytes')
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if downloaded is not None and total:
+                    progress = (downloaded / total) * 100
+                elif '_percent_str' in d:
                     try:
                         progress = float(d['_percent_str'].strip().replace('%', ''))
                     except:
                         pass
-                elif 'downloaded_bytes' in d and 'total_bytes' in d:
-                    progress = (d['downloaded_bytes'] / d['total_bytes']) * 100
-                elif 'downloaded_bytes' in d and 'total_bytes_estimate' in d:
-                    progress = (d['downloaded_bytes'] / d['total_bytes_estimate']) * 100
+
+                # yt-dlp calls this per chunk; coalesce into a few updates/sec
+                now = time.monotonic()
+                if (now - last_emit[0] < PROGRESS_INTERVAL
+                        and abs(progress - last_progress[0]) < PROGRESS_MIN_DELTA):
+                    return
+                last_emit[0] = now
+                last_progress[0] = progress
 
                 progress_callback({
                     'status': 'downloading',
@@ -143,6 +197,11 @@ class YouTubeDownloader:
         ydl_opts = {
             'outtmpl': f'{output_dir}/%(title)s.%(ext)s',
             'progress_hooks': [progress_hook],
+            'cachedir': CACHE_DIR,
+            'concurrent_fragment_downloads': CONCURRENT_FRAGMENTS,
+            'http_chunk_size': HTTP_CHUNK_SIZE,
+            'buffersize': BUFFER_SIZE,
+            'socket_timeout': SOCKET_TIMEOUT,
             'quiet': True,
             'no_warnings': True,
         }
@@ -157,7 +216,7 @@ class YouTubeDownloader:
             }]
         else:
             # Video download
-            format_spec = self.quality_map.get(quality, self.quality_map['best'])
+            format_spec = self.QUALITY_MAP.get(quality, self.QUALITY_MAP['best'])
             ydl_opts['format'] = format_spec
             ydl_opts['merge_output_format'] = video_format
 
@@ -182,16 +241,7 @@ class YouTubeDownloader:
         """Convert HH:MM:SS to seconds."""
         if not time_str:
             return 0
-
-        parts = time_str.split(':')
-        if len(parts) == 3:
-            h, m, s = map(float, parts)
-            return h * 3600 + m * 60 + s
-        elif len(parts) == 2:
-            m, s = map(float, parts)
-            return m * 60 + s
-        else:
-            return float(parts[0])
+        return _parse_time(time_str)
 
     def _trim_file(
         self,
@@ -201,9 +251,6 @@ class YouTubeDownloader:
         progress_callback: Optional[Callable[[Dict], None]] = None
     ) -> str:
         """Trim media file using FFmpeg."""
-        import subprocess
-        import os
-
         if not os.path.exists(filepath):
             # Try to find the actual output file (yt-dlp may have changed extension)
             base_path = os.path.splitext(filepath)[0]
@@ -223,29 +270,73 @@ class YouTubeDownloader:
                 'message': 'Trimming to selected time range...'
             })
 
-        # Build ffmpeg command
-        temp_output = filepath + '.trimmed.tmp'
-        cmd = ['ffmpeg', '-y', '-i', filepath]
+        # Build ffmpeg command, keeping the real extension on the temp file
+        # so ffmpeg can pick the output muxer
+        base_path, ext = os.path.splitext(filepath)
+        temp_output = f'{base_path}.trimmed{ext}'
+        cmd = ['ffmpeg', '-y', '-hide_banner', '-nostats', '-progress', 'pipe:1']
 
+        # Seek on the input (before -i) so ffmpeg jumps straight to the range
+        # instead of demuxing everything up to the start time
         if start_time:
             cmd.extend(['-ss', start_time])
         if end_time:
             cmd.extend(['-to', end_time])
+        cmd.extend(['-i', filepath])
 
         # Use copy mode for fast trimming (no re-encoding)
-        cmd.extend(['-c', 'copy', temp_output])
+        cmd.extend(['-map', '0', '-c', 'copy', '-avoid_negative_ts', 'make_zero'])
+        if ext.lower() in ('.mp4', '.m4a'):
+            cmd.extend(['-movflags', '+faststart'])
+        cmd.append(temp_output)
 
-        try:
-            subprocess.run(cmd, check=True, capture_output=True)
-
-            # Replace original with trimmed
-            os.remove(filepath)
-            os.rename(temp_output, filepath)
-
-            return filepath
-        except subprocess.CalledProcessError as e:
+        # Length of the trimmed span, used to report trim progress
+        duration = None
+        if end_time:
+            duration = self._time_to_seconds(end_time) - self._time_to_seconds(start_time)
+
+        # Stream ffmpeg's output: -progress key=value lines drive the
+        # callback, and only the last few log lines are kept for errors
+        tail = deque(maxlen=50)
+        last_progress = 95
+        proc = subprocess.Popen(
+            cmd,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            errors='replace'
+        )
+        with proc:
+            for line in proc.stdout:
+                line = line.rstrip()
+                key, sep, value = line.partition('=')
+                if not sep or ' ' in key:
+                    tail.append(line)
+                    continue
+                if key == 'out_time_us' and duration and progress_callback:
+                    try:
+                        done = int(value) / 1_000_000 / duration
+                    except ValueError:
+                        continue
+                    progress = 95 + int(min(max(done, 0), 1) * 5)
+                    if progress > last_progress:
+                        last_progress = progress
+                        progress_callback({
+                            'status': 'processing',
+                            'progress': progress,
+                            'filename': filepath,
+                            'message': 'Trimming to selected time range...'
+                        })
+
+        if proc.returncode != 0:
             # Clean up temp file if it exists
             if os.path.exists(temp_output):
                 os.remove(temp_output)
-            stderr = e.stderr.decode() if e.stderr else 'Unknown error'
+            stderr = '\n'.join(tail) or 'Unknown error'
             raise RuntimeError(f'FFmpeg trimming failed: {stderr}')
+
+        # Replace original with trimmed in a single atomic step
+        os.replace(temp_output, filepath)
+
+        return filepath
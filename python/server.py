@@ -1,44 +1,301 @@
 #!/usr/bin/env python3
 """
 YouTube Helper Backend Server
-Flask server with HTTP polling for download progress.
+Flask app served by waitress, with Server-Sent Events (and legacy HTTP
+polling) for download progress.
 """
 
 import argparse
-import uuid
-import threading
+import atexit
+import logging
+import logging.handlers
+import multiprocessing
+import queue
+import secrets
 import sys
 import os
+import shutil
 import subprocess
-from flask import Flask, request, jsonify
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional
+import orjson
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
 from flask_cors import CORS
+from waitress import serve
 from downloader import YouTubeDownloader
 
+
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson."""
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return orjson.loads(s)
+
+    def response(self, *args: Any, **kwargs: Any) -> Response:
+        # Skip the bytes -> str -> bytes round trip of the default response()
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(orjson.dumps(obj), mimetype='application/json')
+
+
+logger = logging.getLogger(__name__)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
+FINAL_STATUSES = ('complete', 'error', 'cancelled')
+# Shared, read-only update applied when a download is cancelled
+CANCELLED_UPDATE = {'status': 'cancelled', 'progress': 0}
+# Seconds between keep-alive comments on an idle progress stream
+STREAM_KEEPALIVE = 15.0
+# Bundled ffmpeg locations, relative to the backend executable's directory
+FFMPEG_BUNDLE_PATHS = (
+    os.path.join('ffmpeg', 'ffmpeg.exe'),  # Same level as exe
+    os.path.join('..', 'ffmpeg', 'ffmpeg.exe'),  # Parent directory
+    os.path.join('..', '..', 'ffmpeg', 'ffmpeg.exe'),  # resources/ffmpeg
+)
+# Pre-encoded /api/health body; the bridge polls it while the backend starts
+HEALTH_BODY = b'{"status":"ok"}'
+# Unsent bytes per connection before waitress blocks the writing thread
+OUTBUF_HIGH_WATERMARK = 256 * 1024
+# Video metadata cache: entries live for INFO_CACHE_TTL seconds, and the
+# least recently used are evicted beyond INFO_CACHE_SIZE
+INFO_CACHE_TTL = 300
+INFO_CACHE_SIZE = 256
+
+
+@dataclass(slots=True)
+class DownloadState:
+    """Progress of a single download as reported to the frontend."""
+    download_id: str
+    status: str = 'downloading'
+    progress: float = 0
+    speed: Optional[str] = None
+    eta: Optional[str] = None
+    filename: Optional[str] = None
+    error: Optional[str] = None
+    # Value of downloads_version at this download's last change
+    version: int = 0
+
+    def update(self, data: Dict[str, Any]) -> None:
+        """Apply a progress update, ignoring keys the frontend doesn't use.
+
+        Must be called with downloads_lock held.
+        """
+        for key in ('status', 'progress', 'speed', 'eta', 'filename', 'error'):
+            if key in data:
+                setattr(self, key, data[key])
+        mark_changed(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'downloadId': self.download_id,
+            'status': self.status,
+            'progress': self.progress,
+            'speed': self.speed,
+            'eta': self.eta,
+            'filename': self.filename,
+            'error': self.error,
+        }
+
+
 downloader = YouTubeDownloader()
+# Bounded worker pool; downloads beyond this limit wait in the queue
+executor = ThreadPoolExecutor(
+    max_workers=int(os.environ.get('YT_HELPER_WORKERS', 4)),
+    thread_name_prefix='dl'
+)
+# 'process' runs each download in a child process so yt-dlp's CPU-bound
+# work (signature deciphering, post-processing) can't stall request handling
+# via the GIL; 'thread' runs it directly on the worker thread
+DOWNLOAD_MODE = os.environ.get('YT_HELPER_DOWNLOAD_MODE', 'process')
+# Guards both downloads and active_downloads, which are shared between
+# request threads and download workers
+downloads_lock = threading.Lock()
+downloads: Dict[str, DownloadState] = {}
 active_downloads = {}
-download_progress = {}
+# Notified whenever a download changes or is cleared; each progress stream
+# compares versions against the last one it sent, so no wake-up is lost
+downloads_changed = threading.Condition(downloads_lock)
+downloads_version = 0
+
+info_cache_lock = threading.Lock()
+# url -> (expiry, info), in least-recently-used order
+info_cache = OrderedDict()
+# url -> in-flight lookup: its 'event' is set once 'info' or 'error' is filled
+info_inflight: Dict[str, Dict[str, Any]] = {}
+
+
+def mark_changed(state: DownloadState) -> None:
+    """Stamp a download with a new version and wake progress streams.
+
+    Must be called with downloads_lock held.
+    """
+    global downloads_version
+    downloads_version += 1
+    state.version = downloads_version
+    downloads_changed.notify_all()
+
+
+def get_download_snapshot(download_id: str) -> Optional[Dict[str, Any]]:
+    """Return a consistent copy of a download's progress, or None."""
+    with downloads_lock:
+        state = downloads.get(download_id)
+        return state.to_dict() if state is not None else None
+
+
+def download_process_main(options, messages, cancel_event):
+    """Entry point for a download running in a child process.
+
+    Progress updates and the final result or error are sent back to the
+    parent as (kind, payload) tuples on the messages queue.
+    """
+    parent = multiprocessing.parent_process()
+
+    def cancel_check():
+        # Also stop if the backend is gone: it can be killed before it
+        # passes on a cancel, and the child would otherwise keep downloading
+        return cancel_event.is_set() or not parent.is_alive()
+
+    try:
+        result = downloader.download(
+            **options,
+            progress_callback=lambda data: messages.put(('progress', data)),
+            cancel_check=cancel_check
+        )
+        messages.put(('result', result))
+    except Exception as e:
+        messages.put(('error', str(e)))
+
+
+def run_download(options, progress_callback, cancel_event):
+    """Run a download according to DOWNLOAD_MODE and return its result."""
+    if DOWNLOAD_MODE == 'thread':
+        return downloader.download(
+            **options,
+            progress_callback=progress_callback,
+            cancel_check=cancel_event.is_set
+        )
+
+    ctx = multiprocessing.get_context('spawn')
+    messages = ctx.Queue()
+    child_cancel = ctx.Event()
+    proc = ctx.Process(
+        target=download_process_main,
+        args=(options, messages, child_cancel),
+        daemon=True
+    )
+    proc.start()
+
+    try:
+        while True:
+            if cancel_event.is_set():
+                child_cancel.set()
+            try:
+                kind, payload = messages.get(timeout=0.5)
+            except queue.Empty:
+                if not proc.is_alive() and messages.empty():
+                    raise RuntimeError(
+                        f'Download process exited unexpectedly (code {proc.exitcode})'
+                    )
+                continue
+
+            if kind == 'progress':
+                progress_callback(payload)
+            elif kind == 'result':
+                return payload
+            else:
+                raise RuntimeError(payload)
+    finally:
+        proc.join(timeout=5)
+
+
+def read_json_body() -> Optional[Dict[str, Any]]:
+    """Parse the request body as a JSON object.
+
+    Returns {} for an empty body and None if it isn't a JSON object. The raw
+    body isn't cached on the request.
+    """
+    try:
+        data = orjson.loads(request.get_data(cache=False) or b'{}')
+    except orjson.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def get_cached_video_info(url: str) -> Dict[str, Any]:
+    """Fetch video metadata, reusing recent results for the same URL.
+
+    Concurrent requests for a URL that isn't cached share a single lookup,
+    including its error if it fails.
+    """
+    with info_cache_lock:
+        entry = info_cache.get(url)
+        if entry is not None and entry[0] > time.monotonic():
+            info_cache.move_to_end(url)
+            return entry[1]
+        pending = info_inflight.get(url)
+        waiting = pending is not None
+        if not waiting:
+            pending = info_inflight[url] = {
+                'event': threading.Event(),
+                'info': None,
+                'error': None
+            }
+
+    if waiting:
+        # Another request is fetching this URL; use its outcome
+        pending['event'].wait()
+        if pending['error'] is not None:
+            raise pending['error']
+        return pending['info']
+
+    try:
+        info = downloader.get_video_info(url)
+        pending['info'] = info
+        with info_cache_lock:
+            info_cache[url] = (time.monotonic() + INFO_CACHE_TTL, info)
+            info_cache.move_to_end(url)
+            while len(info_cache) > INFO_CACHE_SIZE:
+                info_cache.popitem(last=False)
+        return info
+    except Exception as e:
+        # Failures aren't cached; only requests arriving after this retry
+        pending['error'] = e
+        raise
+    finally:
+        with info_cache_lock:
+            del info_inflight[url]
+        pending['event'].set()
 
 
 @app.route('/api/health', methods=['GET'])
 def health_check():
     """Health check endpoint."""
-    return jsonify({'status': 'ok'})
+    return app.response_class(HEALTH_BODY, mimetype='application/json')
 
 
 @app.route('/api/video/info', methods=['POST'])
 def get_video_info():
     """Fetch video metadata."""
-    data = request.get_json()
+    data = read_json_body()
+    if data is None:
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
     url = data.get('url')
 
     if not url:
         return jsonify({'error': 'URL is required'}), 400
 
     try:
-        info = downloader.get_video_info(url)
+        info = get_cached_video_info(url)
         return jsonify(info)
     except Exception as e:
         return jsonify({'error': str(e)}), 400
@@ -47,7 +304,9 @@ def get_video_info():
 @app.route('/api/download/start', methods=['POST'])
 def start_download():
     """Start a download."""
-    data = request.get_json()
+    data = read_json_body()
+    if data is None:
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
 
     url = data.get('url')
     output_dir = data.get('outputDir')
@@ -61,142 +320,244 @@ def start_download():
     if not url or not output_dir:
         return jsonify({'error': 'URL and outputDir are required'}), 400
 
-    download_id = str(uuid.uuid4())
+    download_id = secrets.token_hex(8)
 
     # Initialize progress tracking
-    download_progress[download_id] = {
-        'downloadId': download_id,
-        'status': 'downloading',
-        'progress': 0,
-        'speed': None,
-        'eta': None,
-        'filename': None,
-        'error': None
-    }
+    state = DownloadState(download_id)
+    cancel_event = threading.Event()
 
     def progress_callback(data):
-        """Update progress in the shared dict."""
-        download_progress[download_id].update(data)
-        download_progress[download_id]['downloadId'] = download_id
+        """Update progress in the shared state."""
+        with downloads_lock:
+            state.update(data)
+
+    options = {
+        'url': url,
+        'output_dir': output_dir,
+        'mode': mode,
+        'video_format': video_format,
+        'audio_format': audio_format,
+        'quality': quality,
+        'start_time': start_time,
+        'end_time': end_time,
+    }
 
     def download_thread():
         try:
-            active_downloads[download_id] = {'status': 'downloading', 'cancel': False}
-
-            result = downloader.download(
-                url=url,
-                output_dir=output_dir,
-                mode=mode,
-                video_format=video_format,
-                audio_format=audio_format,
-                quality=quality,
-                start_time=start_time,
-                end_time=end_time,
-                progress_callback=progress_callback,
-                cancel_check=lambda: active_downloads.get(download_id, {}).get('cancel', False)
-            )
-
-            if active_downloads.get(download_id, {}).get('cancel'):
-                download_progress[download_id].update({
-                    'status': 'cancelled',
-                    'progress': 0
-                })
+            result = run_download(options, progress_callback, cancel_event)
+
+            if cancel_event.is_set():
+                progress_callback(CANCELLED_UPDATE)
             else:
-                download_progress[download_id].update({
+                progress_callback({
                     'status': 'complete',
                     'progress': 100,
                     'filename': result.get('filename')
                 })
         except Exception as e:
-            download_progress[download_id].update({
-                'status': 'error',
-                'progress': 0,
-                'error': str(e)
-            })
+            if cancel_event.is_set():
+                # The progress hook aborts yt-dlp by raising
+                progress_callback(CANCELLED_UPDATE)
+            else:
+                progress_callback({
+                    'status': 'error',
+                    'progress': 0,
+                    'error': str(e)
+                })
         finally:
-            if download_id in active_downloads:
-                del active_downloads[download_id]
-
-    thread = threading.Thread(target=download_thread)
-    thread.daemon = True
-    thread.start()
+            with downloads_lock:
+                active_downloads.pop(download_id, None)
+
+    entry = {'cancel_event': cancel_event, 'future': None}
+    with downloads_lock:
+        downloads[download_id] = state
+        # Announce the new download on the shared progress stream
+        mark_changed(state)
+        # Register before submitting, so a download that fails immediately
+        # always finds its entry to remove
+        active_downloads[download_id] = entry
+        entry['future'] = executor.submit(download_thread)
 
     return jsonify({'downloadId': download_id})
 
 
+@app.route('/api/download/stream', methods=['GET'])
+def stream_all_progress():
+    """Stream progress for every download as Server-Sent Events.
+
+    Each open stream holds a server thread, so clients should use this one
+    connection rather than a stream per download. The first frames cover
+    every tracked download; after that only downloads that changed are sent.
+    """
+    def generate():
+        sent_version = 0
+
+        while True:
+            with downloads_changed:
+                downloads_changed.wait_for(
+                    lambda: downloads_version != sent_version,
+                    timeout=STREAM_KEEPALIVE
+                )
+                changed = [
+                    state.to_dict() for state in downloads.values()
+                    if state.version > sent_version
+                ]
+                sent_version = downloads_version
+
+            if not changed:
+                yield b': keep-alive\n\n'
+                continue
+            yield b''.join(b'data: ' + orjson.dumps(progress) + b'\n\n' for progress in changed)
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
+@app.route('/api/download/stream/<download_id>', methods=['GET'])
+def stream_download_progress(download_id):
+    """Stream progress for a download as Server-Sent Events.
+
+    The stream holds a server thread until the download finishes; clients
+    tracking several downloads should use /api/download/stream instead.
+    """
+    with downloads_lock:
+        found = download_id in downloads
+    if not found:
+        return jsonify({'error': 'Download not found'}), 404
+
+    def generate():
+        sent_version = None
+
+        def changed():
+            current = downloads.get(download_id)
+            return current is None or current.version != sent_version
+
+        while True:
+            # Updates landing between frames collapse into the next snapshot;
+            # idle periods only get a comment line to keep the connection open
+            with downloads_changed:
+                downloads_changed.wait_for(changed, timeout=STREAM_KEEPALIVE)
+                current = downloads.get(download_id)
+                if current is None:
+                    return
+                progress = None
+                if current.version != sent_version:
+                    sent_version = current.version
+                    progress = current.to_dict()
+
+            if progress is None:
+                yield b': keep-alive\n\n'
+                continue
+            yield b'data: ' + orjson.dumps(progress) + b'\n\n'
+            if progress['status'] in FINAL_STATUSES:
+                return
+
+    return Response(
+        generate(),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache'}
+    )
+
+
 @app.route('/api/download/progress', methods=['GET'])
 def get_download_progress():
-    """Get progress for all active downloads."""
-    return jsonify(list(download_progress.values()))
+    """Get progress for all active downloads.
+
+    Deprecated: prefer /api/download/stream.
+    """
+    with downloads_lock:
+        progress_list = [state.to_dict() for state in downloads.values()]
+    return jsonify(progress_list)
 
 
 @app.route('/api/download/progress/<download_id>', methods=['GET'])
 def get_single_download_progress(download_id):
     """Get progress for a specific download."""
-    if download_id in download_progress:
-        return jsonify(download_progress[download_id])
+    progress = get_download_snapshot(download_id)
+    if progress is not None:
+        return jsonify(progress)
     return jsonify({'error': 'Download not found'}), 404
 
 
 @app.route('/api/download/cancel', methods=['POST'])
 def cancel_download():
     """Cancel an active download."""
-    data = request.get_json()
+    data = read_json_body()
+    if data is None:
+        return jsonify({'error': 'Request body must be a JSON object'}), 400
     download_id = data.get('downloadId')
 
     if not download_id:
         return jsonify({'error': 'downloadId is required'}), 400
 
-    if download_id in active_downloads:
-        active_downloads[download_id]['cancel'] = True
-        return jsonify({'status': 'cancelling'})
+    with downloads_lock:
+        entry = active_downloads.get(download_id)
+        if entry is None:
+            return jsonify({'error': 'Download not found'}), 404
 
-    return jsonify({'error': 'Download not found'}), 404
+        entry['cancel_event'].set()
+        # Downloads still waiting for a worker can be dropped outright
+        if entry['future'].cancel():
+            del active_downloads[download_id]
+            # The entry may already have been cleared from progress tracking
+            state = downloads.get(download_id)
+            if state is not None:
+                state.update(CANCELLED_UPDATE)
+            return jsonify({'status': 'cancelled'})
+
+    return jsonify({'status': 'cancelling'})
 
 
 @app.route('/api/download/clear/<download_id>', methods=['DELETE'])
 def clear_download(download_id):
     """Clear a completed download from progress tracking."""
-    if download_id in download_progress:
-        del download_progress[download_id]
+    with downloads_lock:
+        state = downloads.pop(download_id, None)
+        if state is not None:
+            # Wake any open stream so it sees the download is gone and closes
+            downloads_changed.notify_all()
+    if state is not None:
         return jsonify({'status': 'cleared'})
     return jsonify({'error': 'Download not found'}), 404
 
 
 def setup_ffmpeg_path():
     """Set up ffmpeg path for bundled executable."""
+    # Already reachable (the Electron bridge prepends resources/ffmpeg to PATH)
+    ffmpeg_path = shutil.which('ffmpeg')
+    if ffmpeg_path:
+        logger.info(f'FFmpeg found at: {os.path.dirname(ffmpeg_path)}')
+        return True
+
     if getattr(sys, 'frozen', False):
         # Running as bundled executable
         bundle_dir = os.path.dirname(sys.executable)
-        # Check multiple possible locations for ffmpeg
-        possible_paths = [
-            os.path.join(bundle_dir, 'ffmpeg'),  # Same level as exe
-            os.path.join(bundle_dir, '..', 'ffmpeg'),  # Parent directory
-            os.path.join(bundle_dir, '..', '..', 'ffmpeg'),  # resources/ffmpeg
-        ]
-
-        for ffmpeg_dir in possible_paths:
-            ffmpeg_exe = os.path.join(ffmpeg_dir, 'ffmpeg.exe')
-            if os.path.exists(ffmpeg_exe):
+        for rel_path in FFMPEG_BUNDLE_PATHS:
+            ffmpeg_exe = os.path.normpath(os.path.join(bundle_dir, rel_path))
+            if os.path.isfile(ffmpeg_exe):
                 # Add to PATH
-                os.environ['PATH'] = ffmpeg_dir + os.pathsep + os.environ.get('PATH', '')
-                print(f'FFmpeg found at: {ffmpeg_dir}')
+                ffmpeg_dir = os.path.dirname(ffmpeg_exe)
+                os.environ['PATH'] = f"{ffmpeg_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+                logger.info(f'FFmpeg found at: {ffmpeg_dir}')
                 return True
 
-        print('Warning: FFmpeg not found in expected locations')
+        logger.warning('FFmpeg not found in expected locations')
         return False
     return True
 
 
-def print_diagnostics():
-    """Print startup diagnostics for debugging."""
-    print('=' * 50)
-    print('YouTube Helper Backend - Startup Diagnostics')
-    print('=' * 50)
-    print(f'Python version: {sys.version}')
-    print(f'Executable: {sys.executable}')
-    print(f'Working directory: {os.getcwd()}')
-    print(f'Frozen (bundled): {getattr(sys, "frozen", False)}')
+def log_diagnostics():
+    """Log startup diagnostics for debugging."""
+    logger.info('=' * 50)
+    logger.info('YouTube Helper Backend - Startup Diagnostics')
+    logger.info('=' * 50)
+    logger.info(f'Python version: {sys.version}')
+    logger.info(f'Executable: {sys.executable}')
+    logger.info(f'Working directory: {os.getcwd()}')
+    logger.info(f'Frozen (bundled): {getattr(sys, "frozen", False)}')
 
     # Check ffmpeg
     try:
@@ -207,20 +568,37 @@ def print_diagnostics():
             timeout=5
         )
         ffmpeg_version = result.stdout.split('\n')[0] if result.returncode == 0 else 'Error'
-        print(f'FFmpeg: {ffmpeg_version}')
+        logger.info(f'FFmpeg: {ffmpeg_version}')
     except FileNotFoundError:
-        print('FFmpeg: NOT FOUND (downloads may fail)')
+        logger.warning('FFmpeg: NOT FOUND (downloads may fail)')
     except Exception as e:
-        print(f'FFmpeg: Error checking - {e}')
+        logger.warning(f'FFmpeg: Error checking - {e}')
 
     # Check yt-dlp
     try:
         import yt_dlp
-        print(f'yt-dlp version: {yt_dlp.version.__version__}')
+        logger.info(f'yt-dlp version: {yt_dlp.version.__version__}')
     except Exception as e:
-        print(f'yt-dlp: Error - {e}')
+        logger.error(f'yt-dlp: Error - {e}')
+
+    logger.info('=' * 50)
+
+
+def setup_logging():
+    """Send log records to stdout through a background listener thread.
 
-    print('=' * 50)
+    Callers only enqueue records; the listener does the console/pipe writes.
+    stdout rather than stderr, since the Electron bridge treats stderr output
+    as errors.
+    """
+    log_queue = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    listener.start()
+    atexit.register(listener.stop)
+
+    root = logging.getLogger()
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    root.setLevel(logging.INFO)
 
 
 def main():
@@ -228,16 +606,33 @@ def main():
     parser.add_argument('--port', type=int, default=5000, help='Port to run the server on')
     args = parser.parse_args()
 
+    setup_logging()
+
     # Setup ffmpeg for bundled mode
     setup_ffmpeg_path()
 
-    # Print diagnostics
-    print_diagnostics()
-
-    print(f'Starting server on port {args.port}')
-    # Use plain Flask server - simple and reliable
-    app.run(host='127.0.0.1', port=args.port, debug=False, threaded=True)
+    # Log diagnostics in the background so the ffmpeg probe (up to 5 s on
+    # a cold or AV-scanned ffmpeg.exe) doesn't delay the server coming up
+    threading.Thread(target=log_diagnostics, name='diagnostics', daemon=True).start()
+
+    logger.info(f'Starting server on port {args.port}')
+    # A small output high-watermark is the back-pressure gate for progress
+    # streams: once a slow client has that much unsent, the stream's thread
+    # blocks on write, and resumes with only the latest snapshot rather than
+    # every intermediate frame piling up in memory. That thread is one of
+    # the `threads` workers, which every open stream occupies anyway, so
+    # clients share the single /api/download/stream connection.
+    serve(
+        app,
+        host='127.0.0.1',
+        port=args.port,
+        threads=8,
+        connection_limit=200,
+        outbuf_high_watermark=OUTBUF_HIGH_WATERMARK
+    )
 
 
 if __name__ == '__main__':
+    # Lets the frozen executable act as a download child process
+    multiprocessing.freeze_support()
     main()
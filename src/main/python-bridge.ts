@@ -7,9 +7,12 @@ import { is } from '@electron-toolkit/utils'
 import log from 'electron-log'
 import { VideoInfo, DownloadOptions, DownloadProgress } from '../shared/types'
 
-// Minimum expected size for the bundled executable (in bytes)
-const MIN_EXE_SIZE = 10 * 1024 * 1024 // 10 MB
-const POLL_INTERVAL = 500 // Poll every 500ms
+// Minimum expected size for the bundled executable (in bytes). The one-folder
+// build keeps only the bootloader in the exe; libraries live in _internal/
+const MIN_EXE_SIZE = 512 * 1024 // 512 KB
+
+// Delay before reopening a progress stream that dropped unexpectedly
+const STREAM_RETRY_DELAY = 1000
 
 export class PythonBridge extends EventEmitter {
   private process: ChildProcess | null = null
@@ -21,8 +24,10 @@ export class PythonBridge extends EventEmitter {
   private maxRetries: number = 3
   private lastError: string = ''
   private outputBuffer: string[] = []
-  private pollInterval: NodeJS.Timeout | null = null
   private activeDownloads: Set<string> = new Set()
+  // Single progress stream shared by all downloads; each open stream holds
+  // one of the backend's worker threads
+  private progressStream: AbortController | null = null
 
   async start(): Promise<void> {
     if (this.starting || this.ready) {
@@ -108,7 +113,8 @@ export class PythonBridge extends EventEmitter {
 
         this.ready = false
         this.starting = false
-        this.stopPolling()
+        this.closeProgressStream()
+        this.activeDownloads.clear()
 
         // Auto-restart with exponential backoff
         if (this.shouldRestart && code !== 0 && code !== null) {
@@ -164,10 +170,12 @@ export class PythonBridge extends EventEmitter {
     this.ready = false
     this.retryCount = 0
 
-    this.stopPolling()
+    this.closeProgressStream()
 
     // Cancel any active downloads via API
-    for (const downloadId of this.activeDownloads) {
+    const activeDownloads = [...this.activeDownloads]
+    this.activeDownloads.clear()
+    for (const downloadId of activeDownloads) {
       try {
         await fetch(`http://127.0.0.1:${this.port}/api/download/cancel`, {
           method: 'POST',
@@ -178,7 +186,6 @@ export class PythonBridge extends EventEmitter {
         // Ignore errors during shutdown
       }
     }
-    this.activeDownloads.clear()
 
     if (!this.process) {
       return
@@ -230,51 +237,83 @@ export class PythonBridge extends EventEmitter {
     return [...this.outputBuffer]
   }
 
-  private startPolling(): void {
-    if (this.pollInterval) return
+  private openProgressStream(): void {
+    if (this.progressStream) return
+    const controller = new AbortController()
+    this.progressStream = controller
+    this.streamProgress(controller)
+  }
 
-    this.pollInterval = setInterval(async () => {
-      if (!this.ready || this.activeDownloads.size === 0) return
+  private async streamProgress(controller: AbortController): Promise<void> {
+    try {
+      // Server-Sent Events for every download, over one connection
+      const response = await fetch(`http://127.0.0.1:${this.port}/api/download/stream`, {
+        signal: controller.signal
+      })
+      if (!response.ok || !response.body) {
+        throw new Error(`Progress stream failed with status ${response.status}`)
+      }
 
-      try {
-        const response = await fetch(`http://127.0.0.1:${this.port}/api/download/progress`)
-        if (response.ok) {
-          const progressList = (await response.json()) as DownloadProgress[]
-
-          for (const progress of progressList) {
-            if (progress.status === 'complete') {
-              this.emit('complete', progress)
-              this.activeDownloads.delete(progress.downloadId)
-              // Clear from server
-              this.clearDownload(progress.downloadId).catch(() => {})
-            } else if (progress.status === 'error') {
-              this.emit('error', progress)
-              this.activeDownloads.delete(progress.downloadId)
-              this.clearDownload(progress.downloadId).catch(() => {})
-            } else if (progress.status === 'cancelled') {
-              this.activeDownloads.delete(progress.downloadId)
-              this.clearDownload(progress.downloadId).catch(() => {})
-            } else {
-              this.emit('progress', progress)
-            }
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+
+      for (;;) {
+        const { done, value } = await reader.read()
+        if (done) break
+
+        buffer += decoder.decode(value, { stream: true })
+        let boundary = buffer.indexOf('\n\n')
+        while (boundary !== -1) {
+          const message = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          boundary = buffer.indexOf('\n\n')
+
+          // Lines starting with ':' are keep-alive comments
+          if (message.startsWith('data: ')) {
+            this.handleProgress(JSON.parse(message.slice(6)) as DownloadProgress)
           }
         }
-      } catch (error) {
-        log.error('Error polling progress:', error)
       }
-    }, POLL_INTERVAL)
-
-    log.info('Started progress polling')
+    } catch (error) {
+      if (!controller.signal.aborted) {
+        log.error('Error streaming download progress:', error)
+      }
+    } finally {
+      if (this.progressStream === controller) {
+        this.progressStream = null
+        // Reconnect while downloads are still running; the first frames of
+        // the new stream resend their current state
+        if (!controller.signal.aborted && this.ready && this.activeDownloads.size > 0) {
+          setTimeout(() => this.openProgressStream(), STREAM_RETRY_DELAY)
+        }
+      }
+    }
   }
 
-  private stopPolling(): void {
-    if (this.pollInterval) {
-      clearInterval(this.pollInterval)
-      this.pollInterval = null
-      log.info('Stopped progress polling')
+  private handleProgress(progress: DownloadProgress): void {
+    if (progress.status === 'complete') {
+      this.activeDownloads.delete(progress.downloadId)
+      this.emit('complete', progress)
+      // Clear from server
+      this.clearDownload(progress.downloadId).catch(() => {})
+    } else if (progress.status === 'error') {
+      this.activeDownloads.delete(progress.downloadId)
+      this.emit('error', progress)
+      this.clearDownload(progress.downloadId).catch(() => {})
+    } else if (progress.status === 'cancelled') {
+      this.activeDownloads.delete(progress.downloadId)
+      this.clearDownload(progress.downloadId).catch(() => {})
+    } else {
+      this.emit('progress', progress)
     }
   }
 
+  private closeProgressStream(): void {
+    this.progressStream?.abort()
+    this.progressStream = null
+  }
+
   private async clearDownload(downloadId: string): Promise<void> {
     try {
       await fetch(`http://127.0.0.1:${this.port}/api/download/clear/${downloadId}`, {
@@ -319,7 +358,7 @@ export class PythonBridge extends EventEmitter {
 
     // Production: use bundled executable
     const exeName = process.platform === 'win32' ? 'yt-helper-backend.exe' : 'yt-helper-backend'
-    const pythonPath = join(process.resourcesPath, 'python', exeName)
+    const pythonPath = join(process.resourcesPath, 'python', 'yt-helper-backend', exeName)
 
     // Set PATH to include ffmpeg directory
     const ffmpegDir = join(process.resourcesPath, 'ffmpeg')
@@ -428,9 +467,9 @@ export class PythonBridge extends EventEmitter {
       body: JSON.stringify(options)
     })
 
-    // Track this download and start polling
+    // Progress arrives on the shared stream, opened with the first download
     this.activeDownloads.add(result.downloadId)
-    this.startPolling()
+    this.openProgressStream()
 
     return result
   }
@@ -440,6 +479,5 @@ export class PythonBridge extends EventEmitter {
       method: 'POST',
       body: JSON.stringify({ downloadId })
     })
-    this.activeDownloads.delete(downloadId)
   }
 }